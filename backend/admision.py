@@ -0,0 +1,108 @@
+import threading
+
+
+class Rechazo(Exception):
+    def __init__(self, motivo, status, retry_after):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ClaseCoste:
+    """
+    Bounded concurrency for one cost class: `concurrencia` requests run, up to
+    `cola` more wait at most `espera` seconds, the rest are shed at once.
+    No user may hold more than `por_usuario` slots (running or queued).
+    """
+
+    def __init__(self, nombre, concurrencia, cola, espera, por_usuario):
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self.espera = espera
+        self.por_usuario = por_usuario
+        self._slots = threading.BoundedSemaphore(concurrencia)
+        self._lock = threading.Lock()
+        self._por_usuario = {}
+        self.en_curso = 0
+        self.en_cola = 0
+        self.atendidas = 0
+        self.rechazadas_cola = 0
+        self.rechazadas_espera = 0
+        self.rechazadas_usuario = 0
+
+    def entrar(self, usuario):
+        with self._lock:
+            if usuario is not None and self._por_usuario.get(usuario, 0) >= self.por_usuario:
+                self.rechazadas_usuario += 1
+                raise Rechazo('Demasiadas peticiones simultáneas de este usuario', 429, 2)
+            if not self._slots.acquire(blocking=False):
+                if self.en_cola >= self.cola:
+                    self.rechazadas_cola += 1
+                    raise Rechazo('Servidor ocupado, inténtalo de nuevo en unos segundos', 503, 5)
+                self.en_cola += 1
+                en_cola = True
+            else:
+                en_cola = False
+            self._sumar_usuario(usuario, 1)
+
+        if en_cola:
+            obtenido = self._slots.acquire(timeout=self.espera)
+            with self._lock:
+                self.en_cola -= 1
+                if not obtenido:
+                    self._sumar_usuario(usuario, -1)
+                    self.rechazadas_espera += 1
+                    raise Rechazo('Servidor ocupado, inténtalo de nuevo en unos segundos', 503, 5)
+
+        with self._lock:
+            self.en_curso += 1
+
+    def salir(self, usuario):
+        with self._lock:
+            self.en_curso -= 1
+            self.atendidas += 1
+            self._sumar_usuario(usuario, -1)
+        self._slots.release()
+
+    def _sumar_usuario(self, usuario, delta):
+        if usuario is None:
+            return
+        valor = self._por_usuario.get(usuario, 0) + delta
+        if valor > 0:
+            self._por_usuario[usuario] = valor
+        else:
+            self._por_usuario.pop(usuario, None)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'concurrencia': self.concurrencia,
+                'cola_max': self.cola,
+                'en_curso': self.en_curso,
+                'en_cola': self.en_cola,
+                'atendidas': self.atendidas,
+                'rechazadas_cola': self.rechazadas_cola,
+                'rechazadas_espera': self.rechazadas_espera,
+                'rechazadas_usuario': self.rechazadas_usuario,
+                'usuarios_activos': len(self._por_usuario)
+            }
+
+
+def plazas_ocupables(clases):
+    """Worker threads the classes can hold at once: running plus queued."""
+    return sum(clase.concurrencia + clase.cola for clase in clases)
+
+
+def comprobar_hilos(clases, hilos, libres):
+    """
+    Queued requests wait holding a worker thread, so running plus queued
+    across all classes must leave `libres` threads for unclassified routes.
+    """
+    ocupables = plazas_ocupables(clases)
+    if ocupables > hilos - libres:
+        raise ValueError(
+            f'Las clases de coste pueden ocupar {ocupables} hilos, pero el worker tiene {hilos} '
+            f'y deben quedar {libres} libres (GUNICORN_THREADS / ADMISION_*)'
+        )
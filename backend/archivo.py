@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+
+from models import db, Curso
+
+# Tablas calientes que se mueven al archivar un curso. Las tablas de archivo se
+# crean con LIKE para heredar exactamente los tipos (incluido el enum de estado)
+# y llevan además la columna archivado_en.
+TABLAS_ARCHIVABLES = ['cursos_leads', 'notas', 'documentos']
+
+
+def tabla_archivo(tabla):
+    return f'{tabla}_archivo'
+
+
+def _columnas(tabla):
+    return [
+        row[0] for row in db.session.execute(db.text("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = CAST(:tabla AS regclass) AND attnum > 0 AND NOT attisdropped
+              AND attgenerated = ''
+            ORDER BY attnum
+        """), {'tabla': tabla})
+    ]
+
+
+def preparar_tablas_archivo():
+    """
+    Create the archive tables if missing and add any column that the hot
+    tables gained since, so both sides always share the same columns.
+    Generated columns are not copied: they are recomputed on restore.
+    """
+    for tabla in TABLAS_ARCHIVABLES:
+        archivo = tabla_archivo(tabla)
+        existe = db.session.execute(
+            db.text("SELECT to_regclass(:t) IS NOT NULL"), {'t': archivo}
+        ).scalar()
+        if not existe:
+            db.session.execute(db.text(f"CREATE TABLE {archivo} (LIKE {tabla} INCLUDING INDEXES)"))
+            db.session.execute(db.text(f"""
+                ALTER TABLE {archivo}
+                ADD COLUMN archivado_en TIMESTAMP NOT NULL DEFAULT now(),
+                ADD FOREIGN KEY (id_lead) REFERENCES leads (id_lead) ON DELETE CASCADE,
+                ADD FOREIGN KEY (id_curso) REFERENCES cursos (id_curso) ON DELETE CASCADE
+            """))
+            # LIKE copia las columnas generadas como columnas normales (y sus índices)
+            generadas = db.session.execute(db.text(
+                "SELECT attname FROM pg_attribute WHERE attrelid = CAST(:tabla AS regclass) AND attgenerated <> ''"
+            ), {'tabla': tabla}).scalars().all()
+            for columna in generadas:
+                db.session.execute(db.text(f'ALTER TABLE {archivo} DROP COLUMN "{columna}"'))
+            db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {archivo}_id_curso_idx ON {archivo} (id_curso)"))
+            db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {archivo}_id_lead_idx ON {archivo} (id_lead)"))
+
+        faltan = db.session.execute(db.text("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = CAST(:tabla AS regclass) AND a.attnum > 0 AND NOT a.attisdropped
+              AND a.attgenerated = ''
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_attribute b
+                  WHERE b.attrelid = CAST(:archivo AS regclass) AND b.attname = a.attname AND NOT b.attisdropped
+              )
+        """), {'tabla': tabla, 'archivo': archivo}).fetchall()
+        for columna, tipo in faltan:
+            db.session.execute(db.text(f'ALTER TABLE {archivo} ADD COLUMN "{columna}" {tipo}'))
+    db.session.commit()
+
+
+def _mover(origen, destino, id_curso, columnas, extra_destino='', extra_origen='', conflicto=''):
+    cols = ', '.join(f'"{c}"' for c in columnas)
+    resultado = db.session.execute(db.text(f"""
+        WITH movidos AS (
+            DELETE FROM {origen} WHERE id_curso = :id_curso RETURNING {cols}
+        )
+        INSERT INTO {destino} ({cols}{extra_destino})
+        SELECT {cols}{extra_origen} FROM movidos
+        {conflicto}
+    """), {'id_curso': id_curso})
+    return resultado.rowcount
+
+
+def archivar_curso(curso):
+    """
+    Move the course relations, notes and documents to the archive tables in
+    one transaction. Returns the number of rows moved per table.
+    """
+    # Los contadores del curso no cambian: las filas solo se mueven
+    db.session.execute(db.text("SET LOCAL ondas.archivando = 'on'"))
+    movidos = {}
+    for tabla in TABLAS_ARCHIVABLES:
+        movidos[tabla] = _mover(
+            tabla, tabla_archivo(tabla), curso.id_curso, _columnas(tabla),
+            extra_destino=', archivado_en', extra_origen=', now()'
+        )
+    curso.archivado = True
+    db.session.commit()
+    return movidos
+
+
+def restaurar_curso(curso):
+    """Move an archived course back to the hot tables."""
+    db.session.execute(db.text("SET LOCAL ondas.archivando = 'on'"))
+    movidos = {}
+    for tabla in TABLAS_ARCHIVABLES:
+        # Si mientras tanto se volvió a apuntar al lead en el curso, manda la fila caliente
+        conflicto = 'ON CONFLICT DO NOTHING' if tabla == 'cursos_leads' else ''
+        movidos[tabla] = _mover(
+            tabla_archivo(tabla), tabla, curso.id_curso, _columnas(tabla), conflicto=conflicto
+        )
+    curso.archivado = False
+    recalcular_contadores_curso(curso.id_curso)
+    db.session.commit()
+    return movidos
+
+
+def recalcular_contadores_curso(id_curso):
+    db.session.execute(db.text("DELETE FROM cursos_contadores WHERE id_curso = :id"), {'id': id_curso})
+    db.session.execute(db.text("""
+        INSERT INTO cursos_contadores (id_curso, estado, total)
+        SELECT id_curso, estado::text, COUNT(*) FROM (
+            SELECT id_curso, estado FROM cursos_leads WHERE id_curso = :id
+            UNION ALL
+            SELECT id_curso, estado FROM cursos_leads_archivo WHERE id_curso = :id
+        ) t GROUP BY id_curso, estado
+    """), {'id': id_curso})
+    db.session.execute(db.text(
+        "UPDATE cursos SET lleno = curso_lleno(id_curso, max_alumnos) WHERE id_curso = :id"
+    ), {'id': id_curso})
+
+
+def cursos_archivables(dias):
+    """Inactive, not yet archived courses that ended more than `dias` days ago."""
+    limite = date.today() - timedelta(days=dias)
+    return (
+        Curso.query
+        .filter(Curso.activo == False, Curso.archivado == False, Curso.fecha_fin < limite)
+        .order_by(Curso.fecha_fin)
+        .all()
+    )
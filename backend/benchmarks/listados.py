@@ -0,0 +1,81 @@
+"""
+Round trips and latency of the paginated listings.
+
+Runs the listings in-process through Flask's test client against the
+configured database. It counts the SQL statements each request sends to
+Postgres and times them. Compare drivers by running it twice:
+
+    python benchmarks/listados.py
+    DB_DRIVER=psycopg python benchmarks/listados.py
+
+Use --latencia-ms to add a fixed delay per statement. This simulates a
+database on another host, where every round trip costs that much.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--latencia-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from app import app, DB_DRIVER
+    from models import Curso, Usuario
+
+    sentencias = [0]
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias[0] += 1
+        if args.latencia_ms:
+            time.sleep(args.latencia_ms / 1000)
+
+    with app.app_context():
+        admin = Usuario.query.filter_by(rol='admin', activo=True).first()
+        curso = Curso.query.filter_by(archivado=False).order_by(Curso.id_curso.desc()).first()
+        if not admin or not curso:
+            sys.exit('Hace falta al menos un usuario admin activo y un curso')
+        token = create_access_token(identity=str(admin.id_usuario), additional_claims={'rol': 'admin'})
+
+    rutas = [
+        f'/api/leads?limit={args.limit}',
+        f'/api/cursos?limit={args.limit}',
+        f'/api/cursos/{curso.id_curso}/leads?limit={args.limit}',
+    ]
+    cliente = app.test_client()
+    cabeceras = {'Authorization': f'Bearer {token}', 'X-Consistencia': 'primario'}
+
+    print(f'Driver: {DB_DRIVER}, limit={args.limit}, latencia simulada={args.latencia_ms} ms')
+    for ruta in rutas:
+        cliente.get(ruta, headers=cabeceras)  # calentamiento (y preparación de sentencias)
+        tiempos, por_peticion = [], []
+        for i in range(args.repeticiones):
+            sentencias[0] = 0
+            inicio = time.perf_counter()
+            # Un parámetro distinto en cada petición para que no la sirva la
+            # caché de respuestas: se mide siempre la consulta
+            respuesta = cliente.get(f'{ruta}&_={i}', headers=cabeceras)
+            tiempos.append(time.perf_counter() - inicio)
+            por_peticion.append(sentencias[0])
+            if respuesta.status_code != 200:
+                sys.exit(f'{ruta}: HTTP {respuesta.status_code}')
+        print(
+            f'{ruta:45} {statistics.mean(por_peticion):6.1f} sentencias/petición  '
+            f'p50 {statistics.median(tiempos) * 1000:7.1f} ms  max {max(tiempos) * 1000:7.1f} ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Login throughput benchmark.
+
+Fires `--concurrencia` parallel logins against a running backend for
+`--segundos` seconds while a probe thread keeps calling /api/auth/me. It
+prints login throughput and latency percentiles, plus the probe latency,
+which shows whether hashing is blocking the other requests.
+
+    python benchmarks/login.py --url http://localhost:5000 --username admin --password ...
+
+With --local it only measures the cost of one hash with the configured
+PASSWORD_HASH_METODO (or --metodo), without a server.
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _peticion(url, datos=None, token=None):
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else None
+    peticion = urllib.request.Request(url, data=cuerpo, method='POST' if cuerpo else 'GET')
+    peticion.add_header('Content-Type', 'application/json')
+    if token:
+        peticion.add_header('Authorization', f'Bearer {token}')
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+            estado, contenido = respuesta.status, respuesta.read()
+    except urllib.error.HTTPError as e:
+        estado, contenido = e.code, e.read()
+    return estado, contenido, time.perf_counter() - inicio
+
+
+def _percentiles(tiempos):
+    if not tiempos:
+        return 'sin datos'
+    tiempos = sorted(tiempos)
+    p = lambda q: tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1000
+    return f'p50 {p(0.5):.0f} ms, p95 {p(0.95):.0f} ms, max {tiempos[-1] * 1000:.0f} ms'
+
+
+def benchmark_servidor(args):
+    credenciales = {'username': args.username, 'password': args.password}
+    estado, contenido, _ = _peticion(f'{args.url}/api/auth/login', credenciales)
+    if estado != 200:
+        sys.exit(f'Login inicial fallido ({estado}): {contenido[:200]!r}')
+    token = json.loads(contenido)['token']
+
+    fin = time.monotonic() + args.segundos
+    resultados = {'tiempos': [], 'estados': {}}
+    sondeo = []
+    lock = threading.Lock()
+
+    def login_en_bucle():
+        while time.monotonic() < fin:
+            estado, _, duracion = _peticion(f'{args.url}/api/auth/login', credenciales)
+            with lock:
+                resultados['estados'][estado] = resultados['estados'].get(estado, 0) + 1
+                if estado == 200:
+                    resultados['tiempos'].append(duracion)
+
+    def sondear():
+        while time.monotonic() < fin:
+            _, _, duracion = _peticion(f'{args.url}/api/auth/me', token=token)
+            sondeo.append(duracion)
+            time.sleep(0.1)
+
+    inicio = time.monotonic()
+    hilo_sondeo = threading.Thread(target=sondear, daemon=True)
+    hilo_sondeo.start()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+        for _ in range(args.concurrencia):
+            pool.submit(login_en_bucle)
+    hilo_sondeo.join()
+    total = time.monotonic() - inicio
+
+    correctos = len(resultados['tiempos'])
+    print(f'Logins correctos: {correctos} en {total:.1f}s ({correctos / total:.1f}/s)')
+    print(f'Respuestas por código: {resultados["estados"]}')
+    print(f'Latencia login: {_percentiles(resultados["tiempos"])}')
+    print(f'Latencia /api/auth/me durante la prueba: {_percentiles(sondeo)}')
+
+
+def benchmark_local(args):
+    import os
+    if args.metodo:
+        os.environ['PASSWORD_HASH_METODO'] = args.metodo
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from credenciales import METODO_HASH, generar_hash
+    from werkzeug.security import check_password_hash
+
+    password_hash = generar_hash('benchmark')
+    tiempos = []
+    for _ in range(args.repeticiones):
+        inicio = time.perf_counter()
+        check_password_hash(password_hash, 'benchmark')
+        tiempos.append(time.perf_counter() - inicio)
+    media = statistics.mean(tiempos)
+    print(f'{METODO_HASH}: {media * 1000:.1f} ms por verificación (~{1 / media:.1f}/s por hilo)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--concurrencia', type=int, default=20)
+    parser.add_argument('--segundos', type=float, default=15)
+    parser.add_argument('--local', action='store_true', help='medir solo el coste del hash, sin servidor')
+    parser.add_argument('--metodo', help='método de hash para --local (por defecto PASSWORD_HASH_METODO)')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.local:
+        benchmark_local(args)
+    elif not args.username or not args.password:
+        parser.error('--username y --password son obligatorios salvo con --local')
+    else:
+        benchmark_servidor(args)
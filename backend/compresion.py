@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# Codecs opcionales: si la librería no está instalada simplemente no se ofrecen
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+TIPOS_COMPRIMIBLES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+def codificaciones_disponibles():
+    """Encodings supported by this process, in server preference order."""
+    disponibles = []
+    if zstandard is not None:
+        disponibles.append('zstd')
+    if brotli is not None:
+        disponibles.append('br')
+    disponibles.append('gzip')
+    return disponibles
+
+
+def elegir_codificacion(accept_encodings):
+    """Pick the best encoding accepted by the client, or None for identity."""
+    return accept_encodings.best_match(codificaciones_disponibles())
+
+
+def es_comprimible(mimetype):
+    return bool(mimetype) and mimetype.startswith(TIPOS_COMPRIMIBLES)
+
+
+def comprimir(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def comprimir_stream(chunks, encoding):
+    """Compress an iterable of byte chunks incrementally (streamed responses)."""
+    if encoding == 'zstd':
+        compresor = zstandard.ZstdCompressor(level=3).compressobj()
+        procesar, finalizar = compresor.compress, compresor.flush
+    elif encoding == 'br':
+        compresor = brotli.Compressor(quality=5)
+        procesar, finalizar = compresor.process, compresor.finish
+    else:
+        # wbits 16+ genera cabecera y trailer gzip
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        procesar, finalizar = compresor.compress, compresor.flush
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        salida = procesar(chunk)
+        if salida:
+            yield salida
+    yield finalizar()
+
+
+def etag_para(clave, version):
+    digest = hashlib.sha1(f'{clave}|{version}'.encode('utf-8')).hexdigest()[:20]
+    return f'{version}-{digest}'
+
+
+class EntradaCache:
+    def __init__(self, version, etag, cuerpo, mimetype):
+        self.version = version
+        self.etag = etag
+        self.cuerpo = cuerpo
+        self.mimetype = mimetype
+        self.creada = time.monotonic()
+        self.codificados = {}
+
+    def codificado(self, encoding):
+        """Return the body in the given encoding, compressing it only once."""
+        if not encoding:
+            return self.cuerpo
+        data = self.codificados.get(encoding)
+        if data is None:
+            data = comprimir(self.cuerpo, encoding)
+            self.codificados[encoding] = data
+        return data
+
+
+class CacheRespuestas:
+    """
+    Small LRU of serialized responses keyed by request and data version.
+    An entry is only valid while the data version it was built from is current.
+    """
+
+    def __init__(self, max_entradas=32, ttl=300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, version):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada.version != version or time.monotonic() - entrada.creada > self.ttl:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave, entrada):
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from admision import Rechazo
+
+# Coste del hash de contraseñas, en el formato de werkzeug: 'scrypt:N:r:p' o
+# 'pbkdf2:sha256:iteraciones'. Al cambiarlo, los hashes antiguos se rehacen en
+# el siguiente login correcto de cada usuario.
+METODO_HASH = os.getenv('PASSWORD_HASH_METODO', 'scrypt:32768:8:1')
+
+
+def _prefijo(password_hash):
+    return password_hash.split('$', 1)[0]
+
+
+# Forma canónica del método (werkzeug completa los parámetros que falten)
+PREFIJO_ACTUAL = _prefijo(generate_password_hash('', method=METODO_HASH))
+
+
+def generar_hash(password):
+    return generate_password_hash(password, method=METODO_HASH)
+
+
+def necesita_rehash(password_hash):
+    return _prefijo(password_hash) != PREFIJO_ACTUAL
+
+
+class VerificadorPasswords:
+    """
+    Runs password hashing on a small bounded thread pool. hashlib's scrypt
+    and pbkdf2 release the GIL, so request threads keep serving while a
+    burst of logins is hashed, and the pool size caps CPU and scrypt memory.
+    Past `hilos + cola` pending jobs new logins are shed with a Rechazo.
+    """
+
+    def __init__(self, hilos=2, cola=16, espera=10):
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='passwords')
+        self._plazas = threading.BoundedSemaphore(hilos + cola)
+        self.espera = espera
+        # Hash con el que se compara cuando el usuario no existe, para que la
+        # respuesta tarde lo mismo y no revele qué usernames son válidos
+        self._hash_falso = generar_hash(os.urandom(16).hex())
+
+    def _ejecutar(self, funcion, *args):
+        if not self._plazas.acquire(blocking=False):
+            raise Rechazo('Demasiados inicios de sesión simultáneos, inténtalo de nuevo en unos segundos', 503, 2)
+        try:
+            futuro = self._pool.submit(funcion, *args)
+        except BaseException:
+            self._plazas.release()
+            raise
+        futuro.add_done_callback(lambda _: self._plazas.release())
+        try:
+            return futuro.result(timeout=self.espera)
+        except FuturesTimeout:
+            raise Rechazo('Servidor ocupado, inténtalo de nuevo en unos segundos', 503, 5)
+
+    def verificar(self, password_hash, password):
+        return self._ejecutar(check_password_hash, password_hash or self._hash_falso, password)
+
+    def generar(self, password):
+        return self._ejecutar(generar_hash, password)
+
+
+class CacheUsuariosActivos:
+    """
+    Short-lived per-process cache of whether a user id is still active, so
+    token checks do not hit the database on every request. Writes in this
+    process invalidate at once; other workers see them within `ttl` seconds.
+    """
+
+    def __init__(self, cargar, ttl=30):
+        self.cargar = cargar
+        self.ttl = ttl
+        self._entradas = {}
+        self._lock = threading.Lock()
+
+    def activo(self, id_usuario):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(id_usuario)
+        if entrada and entrada[1] > ahora:
+            return entrada[0]
+        activo = bool(self.cargar(id_usuario))
+        with self._lock:
+            self._entradas[id_usuario] = (activo, ahora + self.ttl)
+        return activo
+
+    def invalidar(self, id_usuario):
+        with self._lock:
+            self._entradas.pop(id_usuario, None)
@@ -0,0 +1,249 @@
+import re
+import unicodedata
+
+from sqlalchemy import event, inspect
+
+from archivo import recalcular_contadores_curso
+from models import db, Lead, LeadClave
+
+# Detección de duplicados por claves de bloqueo: cada lead se indexa bajo su
+# teléfono normalizado, su email en minúsculas y una clave fonética del nombre.
+# Dos leads solo se comparan si comparten alguna clave, así que encontrar
+# duplicados es un GROUP BY sobre leads_claves en lugar de comparar todos con todos.
+
+CLAVE_TELEFONO = 'telefono'
+CLAVE_MAIL = 'mail'
+CLAVE_NOMBRE = 'nombre'
+
+# Teléfono y email identifican a la persona; el nombre solo sugiere candidatos
+CLAVES_FUERTES = [CLAVE_TELEFONO, CLAVE_MAIL]
+
+# Bloques de nombre más grandes que esto ("maria garcia") no aportan nada
+MAX_BLOQUE_NOMBRE = 10
+
+_FONETICA = [
+    (r'ch', 'X'),
+    (r'll', 'y'),
+    (r'qu', 'k'),
+    (r'g(?=[ei])', 'j'),
+    (r'gu(?=[ei])', 'g'),
+    (r'c(?=[ei])', 's'),
+    (r'c', 'k'),
+    (r'z', 's'),
+    (r'[vw]', 'b'),
+    (r'x', 'ks'),
+    (r'h', ''),
+    (r'y\b', 'i'),
+]
+
+
+def normalizar_telefono(telefono):
+    if not telefono:
+        return None
+    digitos = re.sub(r'\D', '', telefono)
+    if digitos.startswith('00'):
+        digitos = digitos[2:]
+    if len(digitos) == 11 and digitos.startswith('34'):
+        digitos = digitos[2:]
+    return digitos if len(digitos) >= 6 else None
+
+
+def normalizar_mail(mail):
+    if not mail:
+        return None
+    mail = mail.strip().lower()
+    return mail if '@' in mail else None
+
+
+def clave_fonetica(nombre):
+    """
+    Order-independent phonetic key for Spanish names, so "García López, María"
+    and "maria garcia lopez", or "Vázquez"/"Basquez", share a block.
+    """
+    if not nombre:
+        return None
+    texto = unicodedata.normalize('NFKD', nombre.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    tokens = []
+    for token in re.findall(r'[a-z]+', texto):
+        for patron, reemplazo in _FONETICA:
+            token = re.sub(patron, reemplazo, token)
+        token = re.sub(r'(.)\1+', r'\1', token)
+        if len(token) > 1:
+            tokens.append(token)
+    if len(tokens) < 2:
+        return None
+    return ' '.join(sorted(tokens))
+
+
+def claves_lead(nombre, telefono, mail):
+    claves = [
+        (CLAVE_TELEFONO, normalizar_telefono(telefono)),
+        (CLAVE_MAIL, normalizar_mail(mail)),
+        (CLAVE_NOMBRE, clave_fonetica(nombre)),
+    ]
+    return [(tipo, clave) for tipo, clave in claves if clave]
+
+
+def indexar_lead(conn, id_lead, nombre, telefono, mail):
+    conn.execute(db.delete(LeadClave).where(LeadClave.id_lead == id_lead))
+    filas = [
+        {'id_lead': id_lead, 'tipo': tipo, 'clave': clave}
+        for tipo, clave in claves_lead(nombre, telefono, mail)
+    ]
+    if filas:
+        conn.execute(db.insert(LeadClave), filas)
+
+
+# Indexado incremental: en la misma transacción que crea o modifica el lead
+@event.listens_for(Lead, 'after_insert')
+def _indexar_lead_nuevo(mapper, conn, lead):
+    indexar_lead(conn, lead.id_lead, lead.nombre, lead.telefono, lead.mail)
+
+
+@event.listens_for(Lead, 'after_update')
+def _reindexar_lead(mapper, conn, lead):
+    estado = inspect(lead)
+    if any(estado.attrs[campo].history.has_changes() for campo in ('nombre', 'telefono', 'mail')):
+        indexar_lead(conn, lead.id_lead, lead.nombre, lead.telefono, lead.mail)
+
+
+def reindexar_todo(lote=5000):
+    """Rebuild leads_claves for every lead. Returns the number of leads indexed."""
+    db.session.execute(db.delete(LeadClave))
+    total = 0
+    filas = []
+    consulta = db.session.query(Lead.id_lead, Lead.nombre, Lead.telefono, Lead.mail).yield_per(lote)
+    for id_lead, nombre, telefono, mail in consulta:
+        total += 1
+        filas.extend(
+            {'id_lead': id_lead, 'tipo': tipo, 'clave': clave}
+            for tipo, clave in claves_lead(nombre, telefono, mail)
+        )
+        if len(filas) >= lote:
+            db.session.execute(db.insert(LeadClave), filas)
+            filas = []
+    if filas:
+        db.session.execute(db.insert(LeadClave), filas)
+    db.session.commit()
+    return total
+
+
+def grupos_duplicados(incluir_nombre=False):
+    """
+    Clusters of leads that share a strong key (and optionally a small name
+    block), merged transitively. Returns [{'ids': [...], 'motivos': [...]}].
+    """
+    tipos = CLAVES_FUERTES + ([CLAVE_NOMBRE] if incluir_nombre else [])
+    bloques = db.session.execute(db.text("""
+        SELECT tipo, array_agg(id_lead ORDER BY id_lead)
+        FROM leads_claves
+        WHERE tipo = ANY(:tipos)
+        GROUP BY tipo, clave
+        HAVING COUNT(*) > 1 AND (tipo <> :nombre OR COUNT(*) <= :max_nombre)
+    """), {'tipos': tipos, 'nombre': CLAVE_NOMBRE, 'max_nombre': MAX_BLOQUE_NOMBRE}).fetchall()
+
+    # Union-find sobre los bloques: solo toca los leads que tienen algún duplicado
+    padre = {}
+
+    def raiz(x):
+        while padre.setdefault(x, x) != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    for _, ids in bloques:
+        primero = raiz(ids[0])
+        for otro in ids[1:]:
+            padre[raiz(otro)] = primero
+
+    grupos = {}
+    for tipo, ids in bloques:
+        grupo = grupos.setdefault(raiz(ids[0]), {'ids': set(), 'motivos': set()})
+        grupo['ids'].update(ids)
+        grupo['motivos'].add(tipo)
+
+    return sorted(
+        ({'ids': sorted(g['ids']), 'motivos': sorted(g['motivos'])} for g in grupos.values()),
+        key=lambda g: g['ids'][0]
+    )
+
+
+def candidatos_lead(id_lead):
+    """Leads sharing at least one blocking key with the given lead."""
+    filas = db.session.execute(db.text("""
+        SELECT otra.id_lead, array_agg(DISTINCT otra.tipo)
+        FROM leads_claves propia
+        JOIN leads_claves otra ON otra.tipo = propia.tipo AND otra.clave = propia.clave
+        WHERE propia.id_lead = :id AND otra.id_lead <> :id
+        GROUP BY otra.id_lead
+    """), {'id': id_lead}).fetchall()
+    return {id_otro: sorted(motivos) for id_otro, motivos in filas}
+
+
+def fusionar_leads(id_ganador, id_perdedor):
+    """
+    Merge id_perdedor into id_ganador in one transaction: re-parent course
+    relations, notes and documents (hot and archived), fill the winner's empty
+    fields from the loser and delete the loser. When both leads are in the same
+    course the winner's relation is kept, the loser's one is dropped with
+    its estado history, and that course's counters are recomputed.
+    """
+    params = {'g': id_ganador, 'p': id_perdedor}
+    # Cursos (vivos o archivados) en los que están los dos
+    repetidos = [
+        row[0] for row in db.session.execute(db.text("""
+            SELECT id_curso FROM cursos_leads WHERE id_lead = :p
+              AND id_curso IN (SELECT id_curso FROM cursos_leads WHERE id_lead = :g)
+            UNION
+            SELECT id_curso FROM cursos_leads_archivo WHERE id_lead = :p
+              AND id_curso IN (SELECT id_curso FROM cursos_leads_archivo WHERE id_lead = :g)
+        """), params)
+    ]
+    # El historial de la relación descartada no es del ganador: no se mueve
+    db.session.execute(db.text(
+        "DELETE FROM estado_history WHERE id_lead = :p AND id_curso = ANY(:cursos)"
+    ), {**params, 'cursos': repetidos})
+
+    movidos = {}
+    for tabla in ['cursos_leads', 'cursos_leads_archivo']:
+        movidos[tabla] = db.session.execute(db.text(f"""
+            UPDATE {tabla} SET id_lead = :g
+            WHERE id_lead = :p
+              AND id_curso NOT IN (SELECT id_curso FROM {tabla} WHERE id_lead = :g)
+        """), params).rowcount
+    for tabla in ['notas', 'documentos', 'notas_archivo', 'documentos_archivo', 'estado_history',
+                  'outbox_mensajes']:
+        movidos[tabla] = db.session.execute(
+            db.text(f"UPDATE {tabla} SET id_lead = :g WHERE id_lead = :p"), params
+        ).rowcount
+
+    telefono_perdedor = db.session.execute(
+        db.text("SELECT telefono FROM leads WHERE id_lead = :p"), params
+    ).scalar()
+    db.session.execute(db.text("""
+        UPDATE leads g SET
+            mail = COALESCE(g.mail, p.mail),
+            trabajador = COALESCE(g.trabajador, false) OR COALESCE(p.trabajador, false),
+            dni_anverso = COALESCE(g.dni_anverso, p.dni_anverso),
+            dni_reverso = COALESCE(g.dni_reverso, p.dni_reverso)
+        FROM leads p
+        WHERE g.id_lead = :g AND p.id_lead = :p
+    """), params)
+    # Lo que quede del perdedor (relaciones repetidas, claves) cae por cascada
+    db.session.execute(db.text("DELETE FROM leads WHERE id_lead = :p"), params)
+    if telefono_perdedor:
+        # telefono es único: solo se puede heredar una vez borrado el perdedor
+        db.session.execute(db.text(
+            "UPDATE leads SET telefono = :tel WHERE id_lead = :g AND telefono IS NULL"
+        ), {**params, 'tel': telefono_perdedor})
+    # Las relaciones archivadas no tienen triggers de contadores
+    for id_curso in repetidos:
+        recalcular_contadores_curso(id_curso)
+
+    ganador = db.session.execute(
+        db.text("SELECT nombre, telefono, mail FROM leads WHERE id_lead = :g"), params
+    ).one()
+    indexar_lead(db.session, id_ganador, ganador.nombre, ganador.telefono, ganador.mail)
+    db.session.commit()
+    return movidos
@@ -0,0 +1,40 @@
+import os
+
+from memoria import MB, rss_actual
+
+# Red de seguridad adicional: reciclar el worker cada N peticiones (0 = nunca)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+# Umbrales para reciclar el worker tras una petición pesada: RSS total del
+# proceso o crecimiento causado por una sola petición (medido en app.py)
+RECICLAR_RSS_MB = int(os.getenv('MEMORIA_RECICLAR_MB', '768'))
+RECICLAR_DELTA_MB = int(os.getenv('MEMORIA_RECICLAR_DELTA_MB', '256'))
+
+
+def post_request(worker, req, environ, resp):
+    if not worker.alive:
+        return
+    rss = rss_actual()
+    delta = environ.get('ondas.memoria_delta', 0)
+    if rss > RECICLAR_RSS_MB * MB or delta > RECICLAR_DELTA_MB * MB:
+        # alive=False hace que el worker termine lo que tiene en curso y salga;
+        # el arbiter arranca uno nuevo con la memoria limpia
+        worker.log.warning(
+            "Recycling worker %s: RSS %d MB, last request %s grew %d MB",
+            worker.pid, rss // MB, environ.get('PATH_INFO'), delta // MB
+        )
+        worker.alive = False
+
+
+def post_worker_init(worker):
+    # Los hilos de fondo (snapshots, outbox) solo en los workers del servidor,
+    # no en cada proceso que importa app.py
+    from app import iniciar_hilos_de_fondo
+    iniciar_hilos_de_fondo()
+
+
+def worker_exit(server, worker):
+    # Dejar que terminen el trabajo en curso antes de que el proceso salga
+    from app import detener_hilos_de_fondo
+    detener_hilos_de_fondo()
@@ -0,0 +1,73 @@
+import os
+import resource
+import threading
+import tracemalloc
+
+MB = 1024 * 1024
+_PAGINA = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_actual():
+    """Current resident set size in bytes (cheap: one read of /proc)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, ValueError, IndexError):
+        # Sin /proc (macOS en desarrollo): pico de vida del proceso, en KB en Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def tracemalloc_activo():
+    return tracemalloc.is_tracing()
+
+
+class MedicionMemoria:
+    """RSS before/after one request, plus the tracemalloc peak when tracing."""
+
+    def __init__(self):
+        self.rss_inicio = rss_actual()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def terminar(self):
+        self.rss_fin = rss_actual()
+        self.delta = self.rss_fin - self.rss_inicio
+        # Con varios hilos el pico de tracemalloc es del proceso durante la petición
+        self.pico_python = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        return self
+
+
+class EstadisticasMemoria:
+    """Per-route aggregates of RSS growth and Python allocation peaks."""
+
+    def __init__(self):
+        self._rutas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, ruta, medicion):
+        with self._lock:
+            r = self._rutas.setdefault(ruta, {
+                'peticiones': 0, 'crecimiento_total': 0, 'crecimiento_max': 0, 'pico_python_max': 0
+            })
+            r['peticiones'] += 1
+            if medicion.delta > 0:
+                r['crecimiento_total'] += medicion.delta
+            r['crecimiento_max'] = max(r['crecimiento_max'], medicion.delta)
+            if medicion.pico_python:
+                r['pico_python_max'] = max(r['pico_python_max'], medicion.pico_python)
+
+    def top(self, n=10):
+        """Routes ordered by total RSS growth they caused, sizes in MB."""
+        with self._lock:
+            filas = [
+                {
+                    'ruta': ruta,
+                    'peticiones': r['peticiones'],
+                    'crecimiento_total_mb': round(r['crecimiento_total'] / MB, 1),
+                    'crecimiento_max_mb': round(r['crecimiento_max'] / MB, 1),
+                    'pico_python_max_mb': round(r['pico_python_max'] / MB, 1)
+                }
+                for ruta, r in self._rutas.items()
+            ]
+        filas.sort(key=lambda f: (f['crecimiento_total_mb'], f['crecimiento_max_mb']), reverse=True)
+        return filas[:n]
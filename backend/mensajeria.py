@@ -0,0 +1,294 @@
+import abc
+import asyncio
+import json
+import smtplib
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from email.message import EmailMessage
+
+from models import db, Lead, Curso, CursoLead, MensajeOutbox
+
+# Outbox transaccional: los mensajes se insertan en outbox_mensajes en la misma
+# transacción que los decide, y un despachador los reclama por lotes, los envía
+# en paralelo (con límite de tasa por canal) y solo entonces marca
+# mail_enviado / whatsapp_enviado en cursos_leads.
+
+CANAL_MAIL = 'mail'
+CANAL_WHATSAPP = 'whatsapp'
+FLAG_POR_CANAL = {CANAL_MAIL: 'mail_enviado', CANAL_WHATSAPP: 'whatsapp_enviado'}
+
+
+class ErrorEnvio(Exception):
+    pass
+
+
+class Transporte(abc.ABC):
+    """Base transport. `enviar` raises ErrorEnvio when delivery is not confirmed."""
+
+    def __init__(self, por_segundo=10.0):
+        self.limitador = LimitadorTasa(por_segundo)
+
+    @abc.abstractmethod
+    async def enviar(self, mensaje):
+        ...
+
+
+class TransporteSMTP(Transporte):
+    def __init__(self, host, puerto=587, usuario=None, password=None, remitente=None,
+                 tls=True, timeout=20, por_segundo=10.0):
+        super().__init__(por_segundo)
+        self.host = host
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.remitente = remitente or usuario
+        self.tls = tls
+        self.timeout = timeout
+
+    def _enviar_sync(self, mensaje):
+        correo = EmailMessage()
+        correo['From'] = self.remitente
+        correo['To'] = mensaje['destino']
+        correo['Subject'] = mensaje['asunto'] or ''
+        correo['Message-ID'] = f"<outbox-{mensaje['id_mensaje']}@ondasformacion>"
+        correo.set_content(mensaje['cuerpo'])
+        try:
+            with smtplib.SMTP(self.host, self.puerto, timeout=self.timeout) as smtp:
+                if self.tls:
+                    smtp.starttls(context=ssl.create_default_context())
+                if self.usuario:
+                    smtp.login(self.usuario, self.password)
+                rechazados = smtp.send_message(correo)
+        except (smtplib.SMTPException, OSError) as e:
+            raise ErrorEnvio(f'SMTP: {e}') from e
+        if rechazados:
+            raise ErrorEnvio(f'SMTP rechazó: {rechazados}')
+
+    async def enviar(self, mensaje):
+        await asyncio.to_thread(self._enviar_sync, mensaje)
+
+
+class TransporteWebhook(Transporte):
+    """POSTs the message as JSON to an HTTP endpoint (e.g. a WhatsApp gateway)."""
+
+    def __init__(self, url, token=None, timeout=15, por_segundo=10.0):
+        super().__init__(por_segundo)
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _enviar_sync(self, mensaje):
+        payload = json.dumps({
+            'id_mensaje': mensaje['id_mensaje'],
+            'canal': mensaje['canal'],
+            'destino': mensaje['destino'],
+            'asunto': mensaje['asunto'],
+            'mensaje': mensaje['cuerpo']
+        }).encode('utf-8')
+        peticion = urllib.request.Request(self.url, data=payload, method='POST')
+        peticion.add_header('Content-Type', 'application/json')
+        # Permite al proveedor descartar reintentos duplicados
+        peticion.add_header('Idempotency-Key', f"outbox-{mensaje['id_mensaje']}")
+        if self.token:
+            peticion.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+                if not 200 <= respuesta.status < 300:
+                    raise ErrorEnvio(f'Webhook HTTP {respuesta.status}')
+        except urllib.error.HTTPError as e:
+            raise ErrorEnvio(f'Webhook HTTP {e.code}') from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ErrorEnvio(f'Webhook: {e}') from e
+
+    async def enviar(self, mensaje):
+        await asyncio.to_thread(self._enviar_sync, mensaje)
+
+
+class LimitadorTasa:
+    """Async pacing: sends are spaced so there are at most `por_segundo` per second."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0
+        self._siguiente = 0.0
+
+    async def esperar(self):
+        if not self.intervalo:
+            return
+        # Sin await entre leer y reservar el turno: atómico dentro del event loop
+        ahora = time.monotonic()
+        espera = self._siguiente - ahora
+        self._siguiente = max(ahora, self._siguiente) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+def encolar_mensajes(id_curso, canal, asunto, cuerpo, filtros, reenviar=False):
+    """
+    Insert one outbox row per matching course lead in a single INSERT ... SELECT.
+    {nombre} and {curso} in asunto/cuerpo are replaced per lead. Leads already
+    flagged for this channel are skipped unless `reenviar`, and so are leads
+    with a pending message on it. Returns the number of messages queued.
+    """
+    destino = Lead.mail if canal == CANAL_MAIL else Lead.telefono
+    consulta = (
+        db.select(
+            CursoLead.id_curso,
+            CursoLead.id_lead,
+            db.literal(canal),
+            destino,
+            db.func.replace(db.func.replace(db.literal(asunto or ''), '{nombre}', Lead.nombre), '{curso}', Curso.nombre),
+            db.func.replace(db.func.replace(db.literal(cuerpo), '{nombre}', Lead.nombre), '{curso}', Curso.nombre),
+        )
+        .join(Lead, Lead.id_lead == CursoLead.id_lead)
+        .join(Curso, Curso.id_curso == CursoLead.id_curso)
+        .where(CursoLead.id_curso == id_curso, *filtros)
+        .where(destino.isnot(None), destino != '')
+        .where(~db.exists().where(
+            MensajeOutbox.id_curso == CursoLead.id_curso,
+            MensajeOutbox.id_lead == CursoLead.id_lead,
+            MensajeOutbox.canal == canal,
+            MensajeOutbox.estado.in_(['pendiente', 'enviando'])
+        ))
+    )
+    if not reenviar:
+        consulta = consulta.where(db.func.coalesce(getattr(CursoLead, FLAG_POR_CANAL[canal]), False) == False)
+
+    # Se cuentan las filas devueltas: con psycopg 3 el rowcount de este
+    # INSERT ... SELECT llega como -1
+    return len(db.session.execute(
+        db.insert(MensajeOutbox).from_select(
+            ['id_curso', 'id_lead', 'canal', 'destino', 'asunto', 'cuerpo'], consulta
+        ).returning(MensajeOutbox.id_mensaje)
+    ).all())
+
+
+class Despachador:
+    """
+    Claims due outbox rows in batches (FOR UPDATE SKIP LOCKED, so several
+    dispatchers can run), sends them concurrently and records the outcome.
+    Rows stay 'enviando' with a lease; if the process dies they are retried
+    when the lease expires. `detener` lets the batch in flight finish and
+    record its outcome first, so a stopping worker does not resend it.
+    """
+
+    def __init__(self, app, transportes, lote=200, concurrencia=20, max_intentos=5,
+                 reintento_base=30, lease=300, intervalo=5):
+        self.app = app
+        self.transportes = transportes
+        self.lote = lote
+        self.concurrencia = concurrencia
+        self.max_intentos = max_intentos
+        self.reintento_base = reintento_base
+        self.lease = lease
+        self.intervalo = intervalo
+        self._hilo = None
+        self._parar = threading.Event()
+
+    def reclamar(self):
+        return [dict(row._mapping) for row in db.session.execute(db.text("""
+            UPDATE outbox_mensajes SET
+                estado = 'enviando',
+                intentos = intentos + 1,
+                proximo_intento = timezone('utc', now()) + make_interval(secs => :lease)
+            WHERE id_mensaje IN (
+                SELECT id_mensaje FROM outbox_mensajes
+                WHERE estado IN ('pendiente', 'enviando')
+                  AND proximo_intento <= timezone('utc', now())
+                  AND canal = ANY(:canales)
+                ORDER BY proximo_intento
+                LIMIT :lote
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id_mensaje, id_curso, id_lead, canal, destino, asunto, cuerpo, intentos
+        """), {'lease': self.lease, 'canales': list(self.transportes), 'lote': self.lote})]
+
+    async def _enviar_todos(self, mensajes):
+        semaforo = asyncio.Semaphore(self.concurrencia)
+
+        async def enviar(mensaje):
+            transporte = self.transportes[mensaje['canal']]
+            async with semaforo:
+                await transporte.limitador.esperar()
+                try:
+                    await transporte.enviar(mensaje)
+                    return mensaje, None
+                except Exception as e:
+                    return mensaje, str(e) or e.__class__.__name__
+
+        return await asyncio.gather(*(enviar(m) for m in mensajes))
+
+    def _registrar(self, resultados):
+        enviados = [m for m, error in resultados if error is None]
+        fallidos = [(m, error) for m, error in resultados if error is not None]
+
+        if enviados:
+            db.session.execute(db.text("""
+                UPDATE outbox_mensajes SET estado = 'enviado', enviado_en = timezone('utc', now()), ultimo_error = NULL
+                WHERE id_mensaje = ANY(:ids)
+            """), {'ids': [m['id_mensaje'] for m in enviados]})
+            for canal, flag in FLAG_POR_CANAL.items():
+                pares = [(m['id_curso'], m['id_lead']) for m in enviados if m['canal'] == canal]
+                if pares:
+                    db.session.execute(db.text(f"""
+                        UPDATE cursos_leads cl SET {flag} = true, ultimo_contacto = timezone('utc', now())
+                        FROM unnest(CAST(:cursos AS integer[]), CAST(:leads AS integer[])) AS p(id_curso, id_lead)
+                        WHERE cl.id_curso = p.id_curso AND cl.id_lead = p.id_lead
+                    """), {'cursos': [p[0] for p in pares], 'leads': [p[1] for p in pares]})
+
+        for mensaje, error in fallidos:
+            definitivo = mensaje['intentos'] >= self.max_intentos
+            db.session.execute(db.text("""
+                UPDATE outbox_mensajes SET
+                    estado = :estado,
+                    ultimo_error = :error,
+                    proximo_intento = timezone('utc', now()) + make_interval(secs => :espera)
+                WHERE id_mensaje = :id
+            """), {
+                'estado': 'error' if definitivo else 'pendiente',
+                'error': error[:2000],
+                'espera': self.reintento_base * 2 ** (mensaje['intentos'] - 1),
+                'id': mensaje['id_mensaje']
+            })
+        db.session.commit()
+        return len(enviados), len(fallidos)
+
+    def despachar_lote(self):
+        """Claim, send and record one batch. Returns (enviados, fallidos)."""
+        with self.app.app_context():
+            mensajes = self.reclamar()
+            db.session.commit()
+            if not mensajes:
+                return 0, 0
+            inicio = time.monotonic()
+            resultados = asyncio.run(self._enviar_todos(mensajes))
+            enviados, fallidos = self._registrar(resultados)
+            print(f"📨 Outbox: {enviados} enviados, {fallidos} fallidos en {time.monotonic() - inicio:.1f}s", flush=True)
+            return enviados, fallidos
+
+    def ejecutar(self, continuo=True):
+        while not self._parar.is_set():
+            try:
+                enviados, fallidos = self.despachar_lote()
+            except Exception as e:
+                print(f"Error in outbox dispatcher: {e}", flush=True)
+                enviados = fallidos = 0
+            if not continuo and not enviados and not fallidos:
+                return
+            # Si el lote vino lleno se sigue sin esperar
+            if enviados + fallidos < self.lote:
+                self._parar.wait(self.intervalo if continuo else 0)
+
+    def iniciar(self):
+        if self._hilo is not None or not self.transportes:
+            return
+        self._hilo = threading.Thread(target=self.ejecutar, name='despachador-outbox', daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=None):
+        """Stop after the current batch is sent and recorded."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
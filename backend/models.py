@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from werkzeug.security import check_password_hash
 from datetime import datetime
+from replica import SesionEnrutada
+from credenciales import generar_hash
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 class Lead(db.Model):
     __tablename__ = 'leads'
@@ -11,8 +14,12 @@ class Lead(db.Model):
     telefono = db.Column(db.String(20), unique=True)
     mail = db.Column(db.String(150))
     trabajador = db.Column(db.Boolean, default=False)
-    dni_anverso = db.Column(db.LargeBinary)
-    dni_reverso = db.Column(db.LargeBinary)
+    # Los blobs del DNI solo se cargan al acceder a ellos; para los listados basta
+    # con saber si existen, y eso lo calcula la propia consulta
+    dni_anverso = db.mapped_column(db.LargeBinary, deferred=True)
+    dni_reverso = db.mapped_column(db.LargeBinary, deferred=True)
+    has_dni_anverso = db.column_property(db.func.coalesce(db.func.octet_length(dni_anverso), 0) > 0)
+    has_dni_reverso = db.column_property(db.func.coalesce(db.func.octet_length(dni_reverso), 0) > 0)
 
     def to_dict(self):
         return {
@@ -21,10 +28,19 @@ class Lead(db.Model):
             "telefono": self.telefono,
             "mail": self.mail,
             "trabajador": self.trabajador,
-            "has_dni_anverso": bool(self.dni_anverso),
-            "has_dni_reverso": bool(self.dni_reverso)
+            "has_dni_anverso": bool(self.has_dni_anverso),
+            "has_dni_reverso": bool(self.has_dni_reverso)
         }
 
+class LeadClave(db.Model):
+    # Claves de bloqueo para detectar duplicados (ver duplicados.py)
+    __tablename__ = 'leads_claves'
+    id_lead = db.Column(db.Integer, db.ForeignKey('leads.id_lead', ondelete='CASCADE'), primary_key=True)
+    tipo = db.Column(db.String(10), primary_key=True)
+    clave = db.Column(db.String(150), nullable=False)
+
+    __table_args__ = (db.Index('leads_claves_tipo_clave_idx', 'tipo', 'clave'),)
+
 class Curso(db.Model):
     __tablename__ = 'cursos'
     id_curso = db.Column(db.Integer, primary_key=True)
@@ -39,6 +55,7 @@ class Curso(db.Model):
     horas_totales = db.Column(db.Integer, nullable=True)
     para_trabajadores = db.Column(db.Boolean, default=False)
     activo = db.Column(db.Boolean, default=False)
+    archivado = db.Column(db.Boolean, default=False, nullable=False)
 
     def to_dict(self):
         return {
@@ -53,7 +70,8 @@ class Curso(db.Model):
             "horario": self.horario,
             "horas_totales": self.horas_totales,
             "para_trabajadores": self.para_trabajadores,
-            "activo": self.activo
+            "activo": self.activo,
+            "archivado": self.archivado
         }
 
 class CursoLead(db.Model):
@@ -67,6 +85,9 @@ class CursoLead(db.Model):
     whatsapp_enviado = db.Column(db.Boolean, default=False)
     mail_ia = db.Column(db.Boolean, default=False)
     origen = db.Column(db.String(50), default='META')
+    # Reserva de la cola de llamadas: quién tiene el lead y hasta cuándo
+    reservado_por = db.Column(db.Integer)
+    reservado_hasta = db.Column(db.DateTime)
 
     def to_dict(self):
         return {
@@ -81,6 +102,55 @@ class CursoLead(db.Model):
             "origen": self.origen
         }
 
+    def reserva_dict(self):
+        # Fuera de to_dict: reservar no cambia la versión de los datos, así que
+        # no puede ir en respuestas cacheadas (dashboard, /api/leads, snapshots)
+        return {
+            "reservado_por": self.reservado_por,
+            "reservado_hasta": self.reservado_hasta.isoformat() + "Z" if self.reservado_hasta else None
+        }
+
+class CursoContador(db.Model):
+    # Mantenido por triggers sobre cursos_leads; no escribir desde la aplicación
+    __tablename__ = 'cursos_contadores'
+    id_curso = db.Column(db.Integer, db.ForeignKey('cursos.id_curso', ondelete='CASCADE'), primary_key=True)
+    estado = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class EstadoHistory(db.Model):
+    # Histórico append-only de cambios de estado, escrito por trigger sobre cursos_leads
+    __tablename__ = 'estado_history'
+    id = db.Column(db.BigInteger, primary_key=True)
+    id_curso = db.Column(db.Integer, nullable=False)
+    id_lead = db.Column(db.Integer, nullable=False)
+    estado_anterior = db.Column(db.String(50))
+    estado_nuevo = db.Column(db.String(50), nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    id_usuario = db.Column(db.Integer)
+
+    __table_args__ = (
+        # Las filas llegan en orden de fecha: BRIN es diminuto y acota rangos de tiempo
+        db.Index('estado_history_fecha_brin', 'fecha', postgresql_using='brin'),
+        db.Index('estado_history_curso_lead_idx', 'id_curso', 'id_lead'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "id_curso": self.id_curso,
+            "id_lead": self.id_lead,
+            "estado_anterior": self.estado_anterior,
+            "estado_nuevo": self.estado_nuevo,
+            "fecha": self.fecha.isoformat() + "Z" if self.fecha else None,
+            "id_usuario": self.id_usuario
+        }
+
+# Texto indexado de una nota: el título pesa más que el contenido
+EXPRESION_BUSQUEDA_NOTA = (
+    "setweight(to_tsvector('spanish', coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(contenido, '')), 'B')"
+)
+
 class Nota(db.Model):
     __tablename__ = 'notas'
     id_nota = db.Column(db.Integer, primary_key=True)
@@ -90,9 +160,15 @@ class Nota(db.Model):
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
     titulo = db.Column(db.String(100))
     id_autor = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario', ondelete='SET NULL'), nullable=True)
+    # Columna generada por Postgres para la búsqueda de texto; nunca se carga
+    busqueda = db.mapped_column(TSVECTOR, db.Computed(EXPRESION_BUSQUEDA_NOTA, persisted=True), deferred=True)
     
     autor = db.relationship('Usuario', backref='notas')
 
+    __table_args__ = (
+        db.Index('notas_busqueda_gin', 'busqueda', postgresql_using='gin'),
+    )
+
     def to_dict(self):
         return {
             "id_nota": self.id_nota,
@@ -110,7 +186,7 @@ class Documento(db.Model):
     id_documento = db.Column(db.Integer, primary_key=True)
     id_lead = db.Column(db.Integer, db.ForeignKey('leads.id_lead', ondelete='CASCADE'), nullable=False)
     id_curso = db.Column(db.Integer, db.ForeignKey('cursos.id_curso', ondelete='CASCADE'), nullable=False)
-    documento = db.Column(db.LargeBinary)
+    documento = db.mapped_column(db.LargeBinary, deferred=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -122,6 +198,46 @@ class Documento(db.Model):
         }
 
 
+class MensajeOutbox(db.Model):
+    # Mensajes pendientes de envío (mail/WhatsApp); los despacha mensajeria.py
+    __tablename__ = 'outbox_mensajes'
+    id_mensaje = db.Column(db.Integer, primary_key=True)
+    # Contra leads y cursos, no contra cursos_leads: el historial de envíos se
+    # conserva cuando la relación se mueve a cursos_leads_archivo
+    id_curso = db.Column(db.Integer, db.ForeignKey('cursos.id_curso', ondelete='CASCADE'), nullable=False)
+    id_lead = db.Column(db.Integer, db.ForeignKey('leads.id_lead', ondelete='CASCADE'), nullable=False)
+    canal = db.Column(db.String(20), nullable=False)
+    destino = db.Column(db.String(150), nullable=False)
+    asunto = db.Column(db.String(200))
+    cuerpo = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_error = db.Column(db.Text)
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    enviado_en = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('outbox_mensajes_pendientes_idx', 'proximo_intento',
+                 postgresql_where=db.text("estado IN ('pendiente', 'enviando')")),
+    )
+
+    def to_dict(self):
+        return {
+            "id_mensaje": self.id_mensaje,
+            "id_curso": self.id_curso,
+            "id_lead": self.id_lead,
+            "canal": self.canal,
+            "destino": self.destino,
+            "asunto": self.asunto,
+            "estado": self.estado,
+            "intentos": self.intentos,
+            "ultimo_error": self.ultimo_error,
+            "creado": self.creado.isoformat() + "Z" if self.creado else None,
+            "enviado_en": self.enviado_en.isoformat() + "Z" if self.enviado_en else None
+        }
+
+
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
 
@@ -136,7 +252,7 @@ class Usuario(db.Model):
     created_at    = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generar_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -0,0 +1,43 @@
+import math
+
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from models import db
+
+
+def paginar(query, page, limit):
+    """
+    One-round-trip replacement for Flask-SQLAlchemy's paginate(): the total
+    comes from count(*) OVER () on the page query itself instead of a second
+    COUNT statement. Only a page past the end needs an extra COUNT.
+    The query must not use DISTINCT (the window counts rows before it).
+    Returns (rows, total, pages); each row is whatever the query yields.
+    """
+    page = max(page, 1)
+    if limit <= 0:
+        items = query.all()
+        return items, len(items), 1
+
+    filas = (
+        query.add_columns(db.func.count().over().label('total_paginacion'))
+        .limit(limit)
+        .offset((page - 1) * limit)
+        .all()
+    )
+    if filas:
+        total = filas[0][-1]
+    elif page > 1:
+        total = query.order_by(None).count()
+    else:
+        total = 0
+    items = [fila[0] if len(fila) == 2 else tuple(fila[:-1]) for fila in filas]
+    return items, total, math.ceil(total / limit)
+
+
+def en_lista(columna, valores):
+    """
+    `columna = ANY(:array)` instead of IN (...): one bind parameter whatever
+    the list length, so the SQL text is stable and the driver can reuse a
+    prepared statement for it.
+    """
+    return columna == db.any_(db.bindparam(None, list(valores), type_=ARRAY(db.Integer)))
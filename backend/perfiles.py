@@ -0,0 +1,152 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+# Perfilador de muestreo opcional; si no está instalado se usa cProfile
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+MAX_SQL_POR_PERFIL = 500
+_ID_VALIDO = re.compile(r'^[0-9a-zA-Z_-]+$')
+
+
+class PerfilEnCurso:
+    """Profiler plus SQL log for one request."""
+
+    def __init__(self, modo):
+        self.id = datetime.utcnow().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:8]
+        self.modo = modo
+        self.sql = []
+        self.inicio = time.perf_counter()
+        if modo == 'muestreo':
+            self._perfilador = pyinstrument.Profiler(interval=0.001)
+            self._perfilador.start()
+        else:
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+
+    def registrar_sql(self, sentencia, parametros, duracion):
+        if len(self.sql) < MAX_SQL_POR_PERFIL:
+            self.sql.append({
+                'sql': sentencia,
+                'params': repr(parametros)[:500],
+                'ms': round(duracion * 1000, 2)
+            })
+
+    def detener(self):
+        self.duracion = time.perf_counter() - self.inicio
+        if self.modo == 'muestreo':
+            self._perfilador.stop()
+        else:
+            self._perfilador.disable()
+
+
+class AlmacenPerfiles:
+    """
+    Profiles stored on local disk: <id>.json (metadata and SQL), <id>.txt
+    (readable report) and, for cProfile, <id>.prof (pstats, for snakeviz & co).
+    """
+
+    def __init__(self, directorio, maximo=50):
+        self.directorio = directorio
+        self.maximo = maximo
+        # cProfile/pyinstrument no admiten dos perfiles activos a la vez
+        self._activo = threading.Lock()
+
+    def iniciar(self, modo):
+        if modo == 'muestreo' and pyinstrument is None:
+            modo = 'deterministico'
+        if not self._activo.acquire(blocking=False):
+            return None
+        try:
+            return PerfilEnCurso(modo)
+        except Exception:
+            self._activo.release()
+            raise
+
+    def guardar(self, perfil, meta):
+        try:
+            perfil.detener()
+        finally:
+            self._activo.release()
+
+        os.makedirs(self.directorio, exist_ok=True)
+        base = os.path.join(self.directorio, perfil.id)
+        if perfil.modo == 'muestreo':
+            informe = perfil._perfilador.output_text(unicode=True, color=False)
+        else:
+            perfil._perfilador.dump_stats(base + '.prof')
+            salida = io.StringIO()
+            pstats.Stats(perfil._perfilador, stream=salida).sort_stats('cumulative').print_stats(60)
+            informe = salida.getvalue()
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(informe)
+
+        meta = {
+            **meta,
+            'id': perfil.id,
+            'modo': perfil.modo,
+            'ms': round(perfil.duracion * 1000, 1),
+            'num_sql': len(perfil.sql),
+            'ms_sql': round(sum(q['ms'] for q in perfil.sql), 1),
+            'fecha': datetime.utcnow().isoformat() + "Z"
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({**meta, 'sql': perfil.sql}, f, ensure_ascii=False)
+        self._limpiar()
+        return meta
+
+    def _limpiar(self):
+        ids = sorted(self._ids(), reverse=True)
+        for id_perfil in ids[self.maximo:]:
+            self.borrar(id_perfil)
+
+    def _ids(self):
+        if not os.path.isdir(self.directorio):
+            return []
+        return [f[:-5] for f in os.listdir(self.directorio) if f.endswith('.json')]
+
+    def listar(self):
+        perfiles = []
+        for id_perfil in sorted(self._ids(), reverse=True):
+            detalle = self.obtener(id_perfil)
+            if detalle:
+                detalle.pop('sql', None)
+                perfiles.append(detalle)
+        return perfiles
+
+    def obtener(self, id_perfil):
+        if not _ID_VALIDO.match(id_perfil):
+            return None
+        try:
+            with open(os.path.join(self.directorio, id_perfil + '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def ruta(self, id_perfil, extension):
+        if not _ID_VALIDO.match(id_perfil) or extension not in ('json', 'txt', 'prof'):
+            return None
+        ruta = os.path.join(self.directorio, f'{id_perfil}.{extension}')
+        return ruta if os.path.exists(ruta) else None
+
+    def borrar(self, id_perfil):
+        if not _ID_VALIDO.match(id_perfil):
+            return False
+        borrado = False
+        for extension in ('json', 'txt', 'prof'):
+            try:
+                os.unlink(os.path.join(self.directorio, f'{id_perfil}.{extension}'))
+                borrado = True
+            except FileNotFoundError:
+                pass
+        return borrado
@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from admision import Rechazo
+from models import db
+from archivo import recalcular_contadores_curso
+
+# Tablas hijas de leads que se borran explícitamente, por lotes, antes que el lead
+# (documentos primero: son los blobs que se quieren liberar)
+TABLAS_HIJAS_LEAD = [
+    'documentos', 'documentos_archivo',
+    'notas', 'notas_archivo',
+    'cursos_leads', 'cursos_leads_archivo',
+    'estado_history',
+]
+
+SQL_CANDIDATOS = """
+    SELECT l.id_lead
+    FROM leads l
+    WHERE EXISTS (SELECT 1 FROM cursos_leads cl WHERE cl.id_lead = l.id_lead)
+      AND NOT EXISTS (
+          SELECT 1 FROM cursos_leads cl
+          WHERE cl.id_lead = l.id_lead
+            AND (cl.estado::text <> :estado OR cl.ultimo_contacto >= :limite)
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM cursos_leads_archivo ca
+          WHERE ca.id_lead = l.id_lead
+            AND (ca.estado::text <> :estado OR ca.ultimo_contacto >= :limite)
+      )
+    ORDER BY l.id_lead
+"""
+
+
+def borrar_leads(ids):
+    """
+    Set-based delete of the given leads and everything hanging from them, in
+    the current transaction. Archived course counters are recomputed since
+    archive rows are not covered by the counter triggers.
+    """
+    params = {'ids': list(ids)}
+    cursos_archivados = [
+        row[0] for row in db.session.execute(db.text(
+            "SELECT DISTINCT id_curso FROM cursos_leads_archivo WHERE id_lead = ANY(:ids)"
+        ), params)
+    ]
+    borrados = {}
+    for tabla in TABLAS_HIJAS_LEAD:
+        borrados[tabla] = db.session.execute(
+            db.text(f"DELETE FROM {tabla} WHERE id_lead = ANY(:ids)"), params
+        ).rowcount
+    borrados['leads'] = db.session.execute(
+        db.text("DELETE FROM leads WHERE id_lead = ANY(:ids)"), params
+    ).rowcount
+    for id_curso in cursos_archivados:
+        recalcular_contadores_curso(id_curso)
+    return borrados
+
+
+def contar_candidatos(estado, meses):
+    limite = datetime.utcnow() - timedelta(days=30 * meses)
+    return db.session.execute(
+        db.text(f"SELECT COUNT(*) FROM ({SQL_CANDIDATOS}) t"), {'estado': estado, 'limite': limite}
+    ).scalar()
+
+
+def purgar_leads(estado, meses, lote=1000, progreso=None, vacuum=True, parar=None):
+    """
+    Delete, in batches of `lote` committed one by one, every lead whose course
+    relations are all in `estado` with no contact in the last `meses` months.
+    `progreso(borrados, total)` is called after each batch. When the `parar`
+    event is set the purge stops after the batch in progress; since every
+    batch is committed, running it again picks up the remaining leads.
+    """
+    limite = datetime.utcnow() - timedelta(days=30 * meses)
+    params = {'estado': estado, 'limite': limite}
+    total = contar_candidatos(estado, meses)
+    borrados = 0
+    if progreso:
+        progreso(borrados, total)
+
+    while not (parar and parar.is_set()):
+        ids = [
+            row[0] for row in db.session.execute(
+                db.text(f"{SQL_CANDIDATOS} LIMIT :lote FOR UPDATE OF l SKIP LOCKED"),
+                {**params, 'lote': lote}
+            )
+        ]
+        if not ids:
+            break
+        borrados += borrar_leads(ids)['leads']
+        db.session.commit()
+        if progreso:
+            progreso(borrados, total)
+
+    if vacuum and borrados and not (parar and parar.is_set()):
+        # Devuelve al sistema el espacio TOAST de los blobs borrados para reutilizarlo
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for tabla in ['documentos', 'documentos_archivo', 'leads']:
+                conn.exec_driver_sql(f"VACUUM (ANALYZE) {tabla}")
+    return borrados
+
+
+class TrabajosPurga:
+    """
+    In-process registry of background purge jobs and their progress. It is
+    not shared between gunicorn workers: a progress poll served by another
+    worker gets 404 even though the job is still running. `detener` lets the
+    running jobs finish their current batch before the worker exits.
+    """
+
+    def __init__(self):
+        self._trabajos = {}
+        self._hilos = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def lanzar(self, app, estado, meses, lote):
+        if self._parar.is_set():
+            raise Rechazo('El servidor se está reiniciando, inténtalo de nuevo en unos segundos', 503, 5)
+        id_trabajo = uuid.uuid4().hex
+        trabajo = {
+            'id': id_trabajo,
+            'estado': estado,
+            'meses': meses,
+            'situacion': 'en_curso',
+            'borrados': 0,
+            'total': None,
+            'inicio': datetime.utcnow().isoformat() + "Z",
+            'fin': None,
+            'error': None
+        }
+        with self._lock:
+            self._trabajos[id_trabajo] = trabajo
+
+        def progreso(borrados, total):
+            trabajo['borrados'] = borrados
+            trabajo['total'] = total
+
+        def ejecutar():
+            inicio = time.monotonic()
+            with app.app_context():
+                try:
+                    purgar_leads(estado, meses, lote=lote, progreso=progreso, parar=self._parar)
+                    trabajo['situacion'] = 'interrumpido' if self._parar.is_set() else 'terminado'
+                except Exception as e:
+                    db.session.rollback()
+                    trabajo['situacion'] = 'error'
+                    trabajo['error'] = str(e)
+                finally:
+                    trabajo['fin'] = datetime.utcnow().isoformat() + "Z"
+                    print(f"Purga {id_trabajo}: {trabajo['situacion']}, {trabajo['borrados']} leads en {time.monotonic() - inicio:.1f}s", flush=True)
+
+        hilo = threading.Thread(target=ejecutar, name=f'purga-{id_trabajo}', daemon=True)
+        with self._lock:
+            self._hilos = [h for h in self._hilos if h.is_alive()] + [hilo]
+        hilo.start()
+        return trabajo
+
+    def detener(self, timeout=None):
+        """Stop every running job after its current batch and wait for it."""
+        self._parar.set()
+        with self._lock:
+            hilos = list(self._hilos)
+        for hilo in hilos:
+            hilo.join(timeout)
+
+    def obtener(self, id_trabajo):
+        return self._trabajos.get(id_trabajo)
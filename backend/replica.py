@@ -0,0 +1,97 @@
+import threading
+import time
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+BIND_REPLICA = 'replica'
+
+
+class SesionEnrutada(Session):
+    """
+    Session that sends reads to the replica bind when the current request was
+    marked as replica-safe (g.usar_replica). Flushes always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('usar_replica'):
+            replica = self._db.engines.get(BIND_REPLICA)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class EstadoReplica:
+    """
+    Cached health/lag probe of the replica. The probe runs at most once every
+    `intervalo` seconds; a failing probe marks the replica unusable until the
+    next successful one.
+    """
+
+    # En un primario (o réplica sin actividad pendiente) el retraso es 0
+    SQL_LAG = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self, max_lag=10.0, intervalo=5.0):
+        self.max_lag = max_lag
+        self.intervalo = intervalo
+        self.lag = None
+        self.disponible = False
+        self._ultima_comprobacion = 0.0
+        self._lock = threading.Lock()
+
+    def usable(self, engine):
+        ahora = time.monotonic()
+        if ahora - self._ultima_comprobacion >= self.intervalo and self._lock.acquire(blocking=False):
+            try:
+                self._comprobar(engine)
+                self._ultima_comprobacion = ahora
+            finally:
+                self._lock.release()
+        return self.disponible
+
+    def _comprobar(self, engine):
+        try:
+            with engine.connect() as conn:
+                self.lag = float(conn.exec_driver_sql(self.SQL_LAG).scalar() or 0)
+            self.disponible = self.lag <= self.max_lag
+            if not self.disponible:
+                print(f"Replica lag {self.lag:.1f}s > {self.max_lag}s, reading from primary", flush=True)
+        except Exception as e:
+            self.lag = None
+            self.disponible = False
+            print(f"Replica check failed, reading from primary: {e}", flush=True)
+
+
+class RegistroEscrituras:
+    """
+    Remembers recent writes per user so their next reads stay on the primary.
+    The registry is per process: with several gunicorn workers a follow-up
+    read served by another worker may still go to the replica. Clients that
+    need read-your-writes across workers send X-Consistencia: primario.
+    """
+
+    def __init__(self, ventana=5.0):
+        self.ventana = ventana
+        self._escrituras = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, usuario):
+        with self._lock:
+            ahora = time.monotonic()
+            self._escrituras[usuario] = ahora
+            # Purga de entradas caducadas para que el dict no crezca
+            if len(self._escrituras) > 1000:
+                self._escrituras = {
+                    u: t for u, t in self._escrituras.items() if ahora - t < self.ventana
+                }
+
+    def reciente(self, usuario):
+        t = self._escrituras.get(usuario)
+        return t is not None and time.monotonic() - t < self.ventana
@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ARCHIVO_ACTUAL = 'dashboard-actual.json'
+SNAPSHOTS_CONSERVADOS = 2
+
+
+def _escribir_atomico(ruta, datos):
+    directorio = os.path.dirname(ruta)
+    fd, tmp = tempfile.mkstemp(dir=directorio, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def escribir_snapshot(directorio, version, cuerpo):
+    """
+    Write the dashboard JSON (plain and gzip) for a data version and then
+    atomically point dashboard-actual.json at it. Readers therefore always see
+    a complete snapshot.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f'dashboard-{version}'
+    _escribir_atomico(os.path.join(directorio, f'{nombre}.json'), cuerpo)
+    _escribir_atomico(os.path.join(directorio, f'{nombre}.json.gz'), gzip.compress(cuerpo, compresslevel=9))
+
+    actual = {
+        'version': version,
+        'nombre': nombre,
+        'generado': datetime.utcnow().isoformat() + "Z",
+        'generado_ts': time.time(),
+        'bytes': len(cuerpo)
+    }
+    _escribir_atomico(os.path.join(directorio, ARCHIVO_ACTUAL), json.dumps(actual).encode('utf-8'))
+    _limpiar(directorio, nombre)
+    return actual
+
+
+def _limpiar(directorio, actual):
+    versiones = sorted(
+        {int(f.split('.')[0].split('-')[1]) for f in os.listdir(directorio)
+         if f.startswith('dashboard-') and f != ARCHIVO_ACTUAL},
+        reverse=True
+    )
+    for version in versiones[SNAPSHOTS_CONSERVADOS:]:
+        nombre = f'dashboard-{version}'
+        if nombre == actual:
+            continue
+        for sufijo in ('.json', '.json.gz'):
+            try:
+                os.unlink(os.path.join(directorio, nombre + sufijo))
+            except FileNotFoundError:
+                pass
+
+
+def leer_snapshot_actual(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ACTUAL), 'rb') as f:
+            actual = json.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    actual['ruta'] = os.path.join(directorio, actual['nombre'] + '.json')
+    actual['ruta_gzip'] = actual['ruta'] + '.gz'
+    return actual
+
+
+class GeneradorSnapshots:
+    """Background thread calling `generar()` every `intervalo` seconds."""
+
+    def __init__(self, generar, intervalo):
+        self.generar = generar
+        self.intervalo = intervalo
+        self._hilo = None
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        if self._hilo is not None or self.intervalo <= 0:
+            return
+        self._hilo = threading.Thread(target=self._bucle, name='snapshots-dashboard', daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=None):
+        """Stop after the snapshot being built, if any, is written."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            try:
+                self.generar()
+            except Exception as e:
+                print(f"Error generating dashboard snapshot: {e}", flush=True)
+            self._parar.wait(self.intervalo)
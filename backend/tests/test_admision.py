@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from admision import ClaseCoste, Rechazo, comprobar_hilos, plazas_ocupables
+
+
+def clase(concurrencia=1, cola=1, espera=0.05, por_usuario=5):
+    return ClaseCoste('prueba', concurrencia=concurrencia, cola=cola, espera=espera, por_usuario=por_usuario)
+
+
+def test_entrar_y_salir_cuentan():
+    c = clase(concurrencia=2)
+    c.entrar('ana')
+    c.entrar('luis')
+    assert c.metricas()['en_curso'] == 2
+    c.salir('ana')
+    c.salir('luis')
+    m = c.metricas()
+    assert m['en_curso'] == 0
+    assert m['atendidas'] == 2
+    assert m['usuarios_activos'] == 0
+
+
+def test_cola_llena_rechaza_con_503():
+    c = clase(concurrencia=1, cola=0)
+    c.entrar(None)
+    with pytest.raises(Rechazo) as e:
+        c.entrar(None)
+    assert e.value.status == 503
+    assert e.value.retry_after > 0
+    assert c.metricas()['rechazadas_cola'] == 1
+
+
+def test_espera_agotada_libera_la_plaza_del_usuario():
+    c = clase(concurrencia=1, cola=1, espera=0.01)
+    c.entrar('ana')
+    with pytest.raises(Rechazo):
+        c.entrar('luis')
+    m = c.metricas()
+    assert m['en_cola'] == 0
+    assert m['rechazadas_espera'] == 1
+    assert m['usuarios_activos'] == 1
+
+
+def test_limite_por_usuario_429():
+    c = clase(concurrencia=3, por_usuario=1)
+    c.entrar('ana')
+    with pytest.raises(Rechazo) as e:
+        c.entrar('ana')
+    assert e.value.status == 429
+    c.entrar('luis')
+
+
+def test_la_cola_entra_al_liberarse_una_plaza():
+    c = clase(concurrencia=1, cola=1, espera=2)
+    c.entrar('ana')
+    hilo = threading.Thread(target=c.entrar, args=('luis',))
+    hilo.start()
+    while c.metricas()['en_cola'] == 0:
+        pass
+    c.salir('ana')
+    hilo.join(2)
+    assert c.metricas()['en_curso'] == 1
+
+
+def test_comprobar_hilos_deja_hilos_libres():
+    clases = [clase(concurrencia=2, cola=2), clase(concurrencia=1, cola=1)]
+    assert plazas_ocupables(clases) == 6
+    comprobar_hilos(clases, hilos=8, libres=2)
+    with pytest.raises(ValueError):
+        comprobar_hilos(clases, hilos=8, libres=3)
@@ -0,0 +1,80 @@
+import gzip
+
+import pytest
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import compresion
+from compresion import (
+    CacheRespuestas, EntradaCache, codificaciones_disponibles, comprimir,
+    comprimir_stream, elegir_codificacion, es_comprimible, etag_para
+)
+
+
+def aceptadas(cabecera):
+    return parse_accept_header(cabecera, Accept)
+
+
+def test_elegir_codificacion_respeta_al_cliente():
+    assert elegir_codificacion(aceptadas('gzip')) == 'gzip'
+    assert elegir_codificacion(aceptadas('')) is None
+    assert elegir_codificacion(aceptadas('identity')) is None
+    assert elegir_codificacion(aceptadas('gzip;q=0, deflate')) is None
+
+
+def test_elegir_codificacion_prefiere_la_del_servidor():
+    preferida = codificaciones_disponibles()[0]
+    assert elegir_codificacion(aceptadas('gzip, br, zstd')) == preferida
+
+
+def test_sin_brotli_no_se_ofrece_br(monkeypatch):
+    monkeypatch.setattr(compresion, 'brotli', None)
+    monkeypatch.setattr(compresion, 'zstandard', None)
+    assert codificaciones_disponibles() == ['gzip']
+    assert elegir_codificacion(aceptadas('br')) is None
+
+
+def test_es_comprimible():
+    assert es_comprimible('application/json')
+    assert es_comprimible('text/html')
+    assert not es_comprimible('image/png')
+    assert not es_comprimible(None)
+
+
+@pytest.mark.parametrize('encoding', codificaciones_disponibles())
+def test_comprimir_y_stream_son_reversibles(encoding):
+    datos = b'{"leads": []}' * 200
+    if encoding == 'gzip':
+        descomprimir = gzip.decompress
+    elif encoding == 'br':
+        descomprimir = compresion.brotli.decompress
+    else:
+        descomprimir = compresion.zstandard.ZstdDecompressor().decompressobj().decompress
+    assert descomprimir(comprimir(datos, encoding)) == datos
+    assert descomprimir(b''.join(comprimir_stream([datos[:100], datos[100:].decode()], encoding))) == datos
+
+
+def test_etag_depende_de_clave_y_version():
+    assert etag_para('/api/leads?', 3) == etag_para('/api/leads?', 3)
+    assert etag_para('/api/leads?', 3) != etag_para('/api/leads?', 4)
+    assert etag_para('/api/leads?', 3) != etag_para('/api/dashboard?', 3)
+    assert etag_para('/api/leads?', 3).startswith('3-')
+
+
+def test_cache_invalida_por_version_y_expulsa_la_mas_antigua():
+    cache = CacheRespuestas(max_entradas=2, ttl=60)
+    cache.guardar('a', EntradaCache(1, 'e', b'A', 'application/json'))
+    assert cache.obtener('a', 1).cuerpo == b'A'
+    assert cache.obtener('a', 2) is None
+    assert cache.obtener('a', 1) is None
+
+    for clave in 'xyz':
+        cache.guardar(clave, EntradaCache(1, 'e', clave.encode(), 'application/json'))
+    assert cache.obtener('x', 1) is None
+    assert cache.obtener('z', 1) is not None
+
+
+def test_entrada_comprime_una_sola_vez():
+    entrada = EntradaCache(1, 'e', b'x' * 2000, 'application/json')
+    assert entrada.codificado(None) == entrada.cuerpo
+    assert entrada.codificado('gzip') is entrada.codificado('gzip')
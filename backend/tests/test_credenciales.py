@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from admision import Rechazo
+from credenciales import CacheUsuariosActivos, VerificadorPasswords, generar_hash, necesita_rehash
+
+
+def test_hash_actual_no_necesita_rehash():
+    assert not necesita_rehash(generar_hash('secreto'))
+
+
+def test_hash_con_otro_metodo_necesita_rehash():
+    assert necesita_rehash(generate_password_hash('secreto', method='pbkdf2:sha256:1000'))
+    assert necesita_rehash(generate_password_hash('secreto', method='scrypt:1024:8:1'))
+
+
+@pytest.fixture
+def verificador():
+    return VerificadorPasswords(hilos=1, cola=0, espera=5)
+
+
+def test_verificar_y_generar(verificador):
+    password_hash = verificador.generar('secreto')
+    assert verificador.verificar(password_hash, 'secreto')
+    assert not verificador.verificar(password_hash, 'otro')
+
+
+def test_usuario_inexistente_se_compara_con_el_hash_falso(verificador):
+    assert verificador.verificar(None, 'secreto') is False
+
+
+def test_pool_saturado_rechaza_con_503(verificador):
+    ocupado, soltar = threading.Event(), threading.Event()
+
+    def lento():
+        ocupado.set()
+        soltar.wait(5)
+
+    hilo = threading.Thread(target=verificador._ejecutar, args=(lento,))
+    hilo.start()
+    ocupado.wait(5)
+    try:
+        with pytest.raises(Rechazo) as e:
+            verificador.verificar(None, 'secreto')
+        assert e.value.status == 503
+        assert e.value.retry_after > 0
+    finally:
+        soltar.set()
+        hilo.join(5)
+    assert verificador.verificar(None, 'secreto') is False
+
+
+def test_cache_usuarios_activos_y_invalidar():
+    cargas = []
+    activos = {1: True}
+
+    def cargar(id_usuario):
+        cargas.append(id_usuario)
+        return activos.get(id_usuario)
+
+    cache = CacheUsuariosActivos(cargar, ttl=60)
+    assert cache.activo(1) and cache.activo(1)
+    assert cargas == [1]
+    activos[1] = False
+    assert cache.activo(1)
+    cache.invalidar(1)
+    assert not cache.activo(1)
+    assert not cache.activo(2)
+    assert cargas == [1, 1, 2]
+
+
+def test_cache_usuarios_activos_caduca():
+    cargas = []
+    cache = CacheUsuariosActivos(lambda i: cargas.append(i) or True, ttl=0)
+    cache.activo(1)
+    cache.activo(1)
+    assert cargas == [1, 1]
@@ -0,0 +1,42 @@
+from duplicados import (
+    CLAVE_MAIL, CLAVE_NOMBRE, CLAVE_TELEFONO,
+    clave_fonetica, claves_lead, normalizar_mail, normalizar_telefono
+)
+
+
+def test_clave_fonetica_no_depende_del_orden_ni_de_tildes():
+    assert clave_fonetica('García López, María') == clave_fonetica('maria garcia lopez')
+
+
+def test_clave_fonetica_equivalencias():
+    assert clave_fonetica('Juan Vázquez') == clave_fonetica('Juan Basquez')
+    assert clave_fonetica('Ana Guillén') == clave_fonetica('Ana Guiyen')
+    assert clave_fonetica('Cecilia Quintero') == clave_fonetica('Sesilia Kintero')
+    assert clave_fonetica('Hugo Ximénez') == clave_fonetica('Ugo Ksimenes')
+
+
+def test_clave_fonetica_necesita_dos_palabras():
+    assert clave_fonetica('María') is None
+    assert clave_fonetica('') is None
+    assert clave_fonetica(None) is None
+
+
+def test_normalizar_telefono():
+    assert normalizar_telefono('+34 600 11 22 33') == '600112233'
+    assert normalizar_telefono('0034600112233') == '600112233'
+    assert normalizar_telefono('600-112-233') == '600112233'
+    assert normalizar_telefono('123') is None
+    assert normalizar_telefono(None) is None
+
+
+def test_normalizar_mail():
+    assert normalizar_mail('  Ana@Example.COM ') == 'ana@example.com'
+    assert normalizar_mail('sin-arroba') is None
+
+
+def test_claves_lead_omite_las_vacias():
+    assert claves_lead('Ana Pérez', '600112233', None) == [
+        (CLAVE_TELEFONO, '600112233'),
+        (CLAVE_NOMBRE, clave_fonetica('Ana Pérez')),
+    ]
+    assert [tipo for tipo, _ in claves_lead('Ana', None, 'a@b.es')] == [CLAVE_MAIL]
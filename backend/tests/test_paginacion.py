@@ -0,0 +1,68 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from paginacion import en_lista, paginar
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Fila(Base):
+    __tablename__ = 'filas'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    grupo: Mapped[int]
+
+
+@pytest.fixture
+def sesion():
+    # SQLite también tiene count(*) OVER (); basta para probar la paginación
+    motor = sa.create_engine('sqlite://')
+    Base.metadata.create_all(motor)
+    with Session(motor) as sesion:
+        sesion.add_all([Fila(id=i, grupo=i % 3) for i in range(1, 24)])
+        sesion.commit()
+        yield sesion
+
+
+def test_primera_y_ultima_pagina(sesion):
+    consulta = sesion.query(Fila).order_by(Fila.id)
+    items, total, paginas = paginar(consulta, 1, 10)
+    assert [f.id for f in items] == list(range(1, 11))
+    assert (total, paginas) == (23, 3)
+
+    items, total, paginas = paginar(consulta, 3, 10)
+    assert [f.id for f in items] == [21, 22, 23]
+    assert (total, paginas) == (23, 3)
+
+
+def test_pagina_pasado_el_final_cuenta_aparte(sesion):
+    items, total, paginas = paginar(sesion.query(Fila).order_by(Fila.id), 5, 10)
+    assert items == []
+    assert (total, paginas) == (23, 3)
+
+
+def test_sin_resultados(sesion):
+    items, total, paginas = paginar(sesion.query(Fila).filter(Fila.grupo == 7), 1, 10)
+    assert (items, total, paginas) == ([], 0, 0)
+
+
+def test_varias_entidades_devuelven_tuplas(sesion):
+    consulta = sesion.query(Fila, Fila.grupo).order_by(Fila.id)
+    items, total, _ = paginar(consulta, 1, 2)
+    assert [(f.id, grupo) for f, grupo in items] == [(1, 1), (2, 2)]
+    assert total == 23
+
+
+def test_limit_cero_devuelve_todo(sesion):
+    items, total, paginas = paginar(sesion.query(Fila), 0, 0)
+    assert (len(items), total, paginas) == (23, 23, 1)
+
+
+def test_en_lista_texto_estable():
+    def sql(valores):
+        return str(sa.select(Fila.id).where(en_lista(Fila.id, valores)).compile(dialect=postgresql.dialect()))
+    assert sql([1]) == sql(list(range(500)))
+    assert '= ANY (' in sql([1, 2])
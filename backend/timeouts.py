@@ -0,0 +1,93 @@
+import select
+import socket
+import threading
+
+# SQLSTATE de Postgres para una consulta cancelada (statement_timeout o pg_cancel)
+PGCODE_CANCELADA = '57014'
+
+
+def es_cancelacion(e):
+    orig = getattr(e, 'orig', None)
+    # psycopg2 expone el SQLSTATE como pgcode; psycopg 3, como sqlstate
+    return (getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)) == PGCODE_CANCELADA
+
+
+def socket_cliente(environ):
+    return environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+
+
+def cliente_desconectado(sock):
+    """
+    True when the peer closed the connection. Pending bytes (a pipelined
+    keep-alive request) mean the client is still there.
+    """
+    try:
+        legible, _, _ = select.select([sock], [], [], 0)
+        if not legible:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+
+class VigilanteDesconexiones:
+    """
+    Background thread that cancels the running queries of requests whose client
+    has gone away, so an abandoned dashboard refresh stops holding a connection.
+    """
+
+    def __init__(self, intervalo=0.5):
+        self.intervalo = intervalo
+        self._peticiones = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.canceladas = 0
+
+    def registrar(self, clave, sock):
+        if sock is None:
+            return
+        with self._lock:
+            self._peticiones[clave] = {'socket': sock, 'conexiones': [], 'cancelada': False}
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._vigilar, name='vigilante-desconexiones', daemon=True)
+                self._hilo.start()
+
+    def asociar_conexion(self, clave, dbapi_conn):
+        with self._lock:
+            peticion = self._peticiones.get(clave)
+            if peticion is not None and dbapi_conn not in peticion['conexiones']:
+                peticion['conexiones'].append(dbapi_conn)
+
+    def desasociar_conexion(self, clave, dbapi_conn):
+        # Al acabar la transacción la conexión vuelve al pool y puede ser de otra petición
+        with self._lock:
+            peticion = self._peticiones.get(clave)
+            if peticion is not None and dbapi_conn in peticion['conexiones']:
+                peticion['conexiones'].remove(dbapi_conn)
+
+    def quitar(self, clave):
+        with self._lock:
+            peticion = self._peticiones.pop(clave, None)
+        return bool(peticion and peticion['cancelada'])
+
+    def _vigilar(self):
+        evento = threading.Event()
+        while True:
+            evento.wait(self.intervalo)
+            with self._lock:
+                pendientes = [p for p in self._peticiones.values() if p['conexiones'] and not p['cancelada']]
+            for peticion in pendientes:
+                if not cliente_desconectado(peticion['socket']):
+                    continue
+                # Con el lock tomado la lista solo tiene conexiones que la petición
+                # sigue usando: desasociar_conexion no puede soltarlas a medias
+                with self._lock:
+                    if peticion['cancelada'] or not peticion['conexiones']:
+                        continue
+                    peticion['cancelada'] = True
+                    self.canceladas += 1
+                    for conn in peticion['conexiones']:
+                        try:
+                            conn.cancel()
+                        except Exception as e:
+                            print(f"Could not cancel query of disconnected client: {e}", flush=True)
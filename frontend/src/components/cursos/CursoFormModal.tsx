@@ -167,16 +167,21 @@ export function CursoFormModal({ isOpen, onClose, onSubmit, cursoToEdit, isPendi
             />
             <span className="text-sm font-medium">¿Curso ACTIVO?</span>
           </label>
-          <label className="flex items-center gap-2 cursor-pointer">
-            <input
-              type="checkbox"
-              name="lleno"
-              checked={formData.lleno}
-              onChange={handleChange}
-              className="rounded text-accent-from focus:ring-accent-from/50"
-            />
-            <span className="text-sm font-medium text-orange-600">¿Curso LLENO?</span>
-          </label>
+          {/* lleno lo calcula el backend a partir de los inscritos y max_alumnos */}
+          {cursoToEdit && (
+            <label className="flex items-center gap-2 cursor-not-allowed opacity-70">
+              <input
+                type="checkbox"
+                name="lleno"
+                checked={formData.lleno}
+                disabled
+                readOnly
+                className="rounded text-accent-from focus:ring-accent-from/50"
+              />
+              <span className="text-sm font-medium text-orange-600">Curso LLENO</span>
+              <span className="text-xs text-text-secondary">(según inscritos y máximo de alumnos)</span>
+            </label>
+          )}
         </div>
 
         <div className="pt-4 flex justify-end gap-2">